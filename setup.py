@@ -21,7 +21,7 @@ setup(
     install_requires=[
         "click",
         "click_logging",
-        "ijson>=2.5",
+        "ijson>=3.1",
         "jsonpointer",
         "jsonref",
         "ocdsextensionregistry",
@@ -32,6 +32,9 @@ setup(
         "flatten-dict",
     ],
     extras_require={
+        "fast": [
+            "orjson",
+        ],
         "test": [
             "coveralls",
             "jmespath",
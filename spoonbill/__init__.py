@@ -1,15 +1,13 @@
 import logging
-from operator import attrgetter
 from pathlib import Path
 
-from ocdsextensionregistry import ProfileBuilder
 from ocdskit.util import detect_format
 
 from spoonbill.common import COMBINED_TABLES, CURRENT_SCHEMA_TAG, ROOT_TABLES, TABLE_THRESHOLD
 from spoonbill.flatten import Flattener
 from spoonbill.i18n import LOCALE, _
 from spoonbill.stats import DataPreprocessor
-from spoonbill.utils import get_reader, iter_file, resolve_file_uri
+from spoonbill.utils import get_package_schema, get_reader, iter_file, open_file, resolve_file_uri
 from spoonbill.writers import CSVWriter, XlsxWriter
 
 LOGGER = logging.getLogger("spoonbill")
@@ -51,12 +49,15 @@ class FileAnalyzer:
             self.spec = None
         self.pkg_type = pkg_type
 
-    def analyze_file(self, filenames, with_preview=True):
+    def analyze_file(self, filenames, with_preview=True, progress_interval=100):
 
         """Analyze provided file
         :param filename: Input filename
         :param with_preview: Generate preview during analysis
+        :param progress_interval: Number of items between reads of the file position
         """
+        if progress_interval < 1:
+            raise ValueError(_("Progress interval must be a positive number, got {}").format(progress_interval))
         if not isinstance(filenames, list):
             filenames = [filenames]
 
@@ -81,36 +82,42 @@ class FileAnalyzer:
                     table_threshold=self.table_threshold,
                     multiple_values=self.multiple_values,
                 )
-            reader = get_reader(path)
-            with reader(path, "rb") as fd:
+            with open_file(path) as fd:
+                # For gzipped files, report the position in the compressed stream: it is cheap to get and it is
+                # comparable to the size of the file on disk
+                raw = getattr(fd, "fileobj", fd)
                 items = iter_file(fd, self.pkg_type, multiple_values=self.multiple_values)
+                # each count is yielded once the next item is processed, so the last one gets the final position
+                read, last = 0, None
                 for count in self.spec.process_items(items, with_preview=with_preview):
-                    yield fd.tell(), count
+                    if last is not None:
+                        yield read, last
+                    if not count % progress_interval:
+                        read = raw.tell()
+                    last = count
+                if last is not None:
+                    yield raw.tell(), last
 
     def dump_to_file(self, filenames):
         """Save analyzed information to file
 
-        :param filename: Output filename in working directory
+        :param filenames: Output filename in working directory, or list of filenames for multi-file input
         """
         if not isinstance(filenames, list):
             filenames = [filenames]
-        filename = filenames[0] / str(len(filenames)) if len(filenames) > 1 else ""
-        path = self.workdir / filename
-        self.spec.dump(path)
+        filename = f"{filenames[0]}-{len(filenames)}" if len(filenames) > 1 else str(filenames[0])
+        self.spec.dump(self.workdir / filename)
 
     def parse_schema(self, input_format, schema=None):
         if schema:
             schema = resolve_file_uri(schema)
         if "release" in input_format:
             pkg_type = "releases"
-            getter = attrgetter("release_package_schema")
         else:
             pkg_type = "records"
-            getter = attrgetter("record_package_schema")
         if not schema:
             LOGGER.info(_("No schema provided, using version {}").format(CURRENT_SCHEMA_TAG))
-            profile = ProfileBuilder(CURRENT_SCHEMA_TAG, {})
-            schema = getter(profile)()
+            schema = get_package_schema(CURRENT_SCHEMA_TAG, pkg_type)
         title = schema.get("title", "").lower()
         if not title:
             raise ValueError(_("Incomplete schema, please make sure your data is correct"))
@@ -159,17 +166,16 @@ class FileFlattener:
     def _flatten(self, filenames, writers):
         if not isinstance(filenames, list):
             filenames = [filenames]
+        writerows = [wr.writerows for wr in writers]
         for filename in filenames:
             path = self.workdir / filename
-            reader = get_reader(path)
-            with reader(path, "rb") as fd:
+            with open_file(path) as fd:
                 items = iter_file(fd, self.pkg_type, multiple_values=self.multiple_values)
-                for count, data in self.flattener.flatten(items):
+                for counters, data in self.flattener.flatten_batch(items):
                     for table, rows in data.items():
-                        for row in rows:
-                            for wr in writers:
-                                wr.writerow(table, row)
-                    yield count
+                        for write in writerows:
+                            write(table, rows)
+                    yield from counters
 
     def flatten_file(self, filename):
         """Flatten file
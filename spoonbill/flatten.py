@@ -1,6 +1,8 @@
 import logging
-from collections import defaultdict, deque
+import sys
+from collections import defaultdict
 from dataclasses import dataclass, field, is_dataclass
+from itertools import chain
 from typing import List, Mapping
 
 from spoonbill.common import DEFAULT_FIELDS, JOINABLE, JOINABLE_SEPARATOR
@@ -10,9 +12,11 @@ from spoonbill.spec import Table
 from spoonbill.utils import get_pointer, get_root, make_count_column
 
 LOGGER = logging.getLogger("spoonbill")
+# slots speed up options access while flattening, but dataclasses support them only since Python 3.10
+DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
-@dataclass
+@dataclass(**DATACLASS_OPTIONS)
 class TableFlattenConfig:
     """Table specific flattening configuration
 
@@ -34,7 +38,7 @@ class TableFlattenConfig:
     name: str = ""
 
 
-@dataclass
+@dataclass(**DATACLASS_OPTIONS)
 class FlattenOptions:
     """Flattening configuration
 
@@ -81,6 +85,12 @@ class Flattener:
         self._lookup_cache = {}
         self._types_cache = {}
         self._path_cache = {}
+        self._cache = {}
+        self._table_options = {}
+        self._array_cache = {}
+        self._dispatch_cache = {}
+        # value type -> dict, list or False for scalars
+        self._kinds = {dict: dict, list: list, str: False, int: False, float: False, bool: False, type(None): False}
 
         # init cache and filter only selected tables
         self.tables = {}
@@ -100,6 +110,8 @@ class Flattener:
                 c_table = tables[c_name]
                 self._init_child_tables(tables, table, c_table, options)
         self._init_options(self.tables)
+        self._init_table_options()
+        self._init_lookup()
 
     def _init_child_tables(self, tables, table, c_table, options):
         split = options.split
@@ -200,6 +212,53 @@ class Flattener:
                             child_table.combined_columns[col_id] = col
                             child_table.titles[col_id] = title
 
+    def _init_table_options(self):
+        # per table options used while flattening, with column lists as sets for fast membership checks
+        for name, options in self.options.selection.items():
+            self._table_options[name] = (
+                options.split,
+                frozenset(options.only),
+                frozenset(options.repeat),
+                frozenset(options.unnest),
+            )
+
+    def _init_lookup(self):
+        # single lookup for columns and types caches, columns take precedence
+        for path in chain(self._lookup_cache, self._types_cache):
+            if path not in self._cache:
+                table = self._lookup_cache.get(path) or self._types_cache.get(path)
+                self._cache[path] = (table, table.types.get(path))
+
+    def _compile_key(self, dispatch, path, key, separator):
+        # paths are bounded by schema, so for every path and key everything needed
+        # to flatten the item is resolved once: pointer, table, item type, table options
+        # and the table array matching the pointer.
+        # Keys which are not exported are marked with False
+        pointer = sys.intern(separator.join((path, key)))
+        hit = self._cache.get(pointer)
+        if hit is None:
+            entry = False
+        else:
+            table, item_type = hit
+            split, only, repeat, unnest = self._table_options[table.name]
+            entry = (pointer, table, item_type, split, repeat, self._is_array(table, pointer))
+        dispatch[key] = entry
+        return entry
+
+    def _is_array(self, table, path):
+        # tables arrays do not change during flattening so matching array can be cached
+        key = (table.name, path)
+        array = self._array_cache.get(key)
+        if array is None:
+            array = self._array_cache[key] = table.is_array(path)
+        return array
+
+    def _get_kind(self, value):
+        # subclasses such as OrderedDict are resolved once per type
+        kind = dict if isinstance(value, dict) else list if isinstance(value, list) else False
+        self._kinds[type(value)] = kind
+        return kind
+
     def _only(self, table, only, split):
         columns = table.columns
         if split:
@@ -218,74 +277,97 @@ class Flattener:
         :return: Iterator over mapping between table name and list of rows for each release
         """
 
+        separator = "/"
+        table_options = self._table_options
+        count = self.options.count
+        path_get = self._path_cache.get
+        dispatch_cache = self._dispatch_cache
+        compile_key = self._compile_key
+        kinds_get = self._kinds.get
+        get_kind = self._get_kind
+        # used as a stack and always emptied by the end of each release, so it can be reused
+        to_flatten = []
+
         for counter, release in enumerate(releases):
-            to_flatten = deque([("", "", "", {}, release, {})])
-            separator = "/"
-            rows = Rows(ocid=release["ocid"], buyer=release.get("buyer", {}), data=defaultdict(list))
+            to_flatten.append(("", "", "", {}, release, {}))
+            rows = Rows(ocid=release["ocid"], buyer=release.get("buyer", {}), data={})
+            data = rows.data
 
             while to_flatten:
                 abs_path, path, parent_key, parent, record, repeat = to_flatten.pop()
 
-                table = self._path_cache.get(path)
+                table = path_get(path)
                 if path == "/buyer":
                     # only useful in analysis
                     continue
                 if table:
                     # Strict match /tender /parties etc., so this is a new row
                     row = rows.new_row(table, record.get("id", ""))
-                    only = self.options.selection[table.name].only
+                    only = table_options[table.name][1]
                     if only:
                         row = {col: col_v for col, col_v in row.items() if col in only}
                     if table.is_root:
                         repeat = {}
                     if repeat:
                         row.update(repeat)
-                    rows.data[table.name].append(row)
+                    # rows of a table are always started here, so its list is created only once
+                    table_rows = data.get(table.name)
+                    if table_rows is None:
+                        table_rows = data[table.name] = []
+                    table_rows.append(row)
+                dispatch = dispatch_cache.get(path)
+                if dispatch is None:
+                    dispatch = dispatch_cache[path] = {}
                 for key, item in record.items():
-                    pointer = separator.join((path, key))
-                    abs_pointer = separator.join((abs_path, key))
-
-                    table = self._lookup_cache.get(pointer) or self._types_cache.get(pointer)
-                    if not table:
+                    entry = dispatch.get(key)
+                    if entry is None:
+                        entry = compile_key(dispatch, path, key, separator)
+                    if not entry:
                         continue
 
-                    item_type = table.types.get(pointer)
-                    options = self.options.selection[table.name]
-                    split = options.split
-                    if pointer in options.repeat:
+                    pointer, table, item_type, split, repeat_cols, array = entry
+                    abs_pointer = separator.join((abs_path, key))
+                    if pointer in repeat_cols:
                         repeat[pointer] = item
 
-                    if isinstance(item, dict):
+                    kind = kinds_get(type(item))
+                    if kind is None:
+                        kind = get_kind(item)
+                    if kind is dict:
                         to_flatten.append((abs_pointer, pointer, key, record, item, repeat))
-                    elif isinstance(item, list):
+                    elif kind is list:
                         if item_type == JOINABLE:
                             value = JOINABLE_SEPARATOR.join(item)
-                            rows.data[table.name][-1][pointer] = value
+                            data[table.name][-1][pointer] = value
                         else:
-                            if self.options.count and pointer not in table.path and split and table.should_split:
-                                abs_pointer = get_pointer(
+                            if count and pointer not in table.path and split and table.should_split:
+                                count_pointer = get_pointer(
                                     table,
                                     abs_pointer,
                                     pointer,
                                     split,
                                     separator=separator,
+                                    array=array,
                                 )
-                                abs_pointer += "Count"
-                                if abs_pointer in table:
-                                    rows.data[table.name][-1][abs_pointer] = len(item)
+                                count_pointer += "Count"
+                                if count_pointer in table:
+                                    data[table.name][-1][count_pointer] = len(item)
                             for index, value in enumerate(item):
-                                if isinstance(value, dict):
-                                    abs_pointer = get_pointer(
-                                        table,
-                                        separator.join((abs_path, key)),
-                                        pointer,
-                                        split,
-                                        separator=separator,
-                                        index=str(index),
-                                    )
+                                kind = kinds_get(type(value))
+                                if kind is None:
+                                    kind = get_kind(value)
+                                if kind is dict:
                                     to_flatten.append(
                                         (
-                                            abs_pointer,
+                                            get_pointer(
+                                                table,
+                                                abs_pointer,
+                                                pointer,
+                                                split,
+                                                separator=separator,
+                                                index=str(index),
+                                                array=array,
+                                            ),
                                             pointer,
                                             key,
                                             record,
@@ -297,12 +379,35 @@ class Flattener:
                         if table.is_combined:
                             pointer = separator + separator.join((parent_key, key))
                             abs_pointer = pointer
-                        if not table.is_root:
-                            root = get_root(table)
-                            unnest = self.options.selection[root.name].unnest
-                            if unnest and abs_pointer in unnest:
-                                rows.data[root.name][-1][abs_pointer] = item
-                                continue
-                        pointer = get_pointer(table, abs_pointer, pointer, split, separator=separator)
-                        rows.data[table.name][-1][pointer] = item
+                        if table.is_root:
+                            data[table.name][-1][abs_pointer] = item
+                            continue
+                        root = get_root(table)
+                        unnest = table_options[root.name][3]
+                        if unnest and abs_pointer in unnest:
+                            data[root.name][-1][abs_pointer] = item
+                            continue
+                        pointer = get_pointer(table, abs_pointer, pointer, split, separator=separator, array=array)
+                        data[table.name][-1][pointer] = item
             yield counter, rows
+
+    def flatten_batch(self, releases, batch_size=1024):
+        """Flatten releases in batches
+
+        Rows of consecutive releases are grouped by table, so they can be handed to writers in bulk.
+
+        :param releases: releases as iterable object
+        :param batch_size: Maximum number of releases in each batch
+        :return: Iterator over range of release counters and mapping between table name and list of rows for each batch
+        """
+        batch = defaultdict(list)
+        first, counter = 0, None
+        for counter, rows in self.flatten(releases):
+            for name, table_rows in rows.items():
+                batch[name].extend(table_rows)
+            if counter + 1 - first >= batch_size:
+                yield range(first, counter + 1), batch
+                batch = defaultdict(list)
+                first = counter + 1
+        if counter is not None and counter >= first:
+            yield range(first, counter + 1), batch
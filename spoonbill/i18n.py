@@ -8,7 +8,7 @@ import jsonref
 import pkg_resources
 
 from spoonbill.common import COMBINED_TABLES
-from spoonbill.utils import common_prefix, extract_type
+from spoonbill.utils import extract_type, path_has_prefix
 
 DOMAIN = "spoonbill"
 LOCALEDIR = pkg_resources.resource_filename(DOMAIN, "locales/")
@@ -80,7 +80,7 @@ def extract_schema_po(fileobj, keywords, comment_tags, options):
                     else:
                         if combined_paths:
                             for p in combined_paths:
-                                if common_prefix(p, pointer) == p:
+                                if path_has_prefix(pointer, p):
                                     yield "/" + "/".join((parent_key, key))
                                     # break
                         yield pointer
@@ -1,11 +1,12 @@
 import logging
+import sys
 from collections import OrderedDict
 from dataclasses import dataclass, field, is_dataclass
 from typing import List, Mapping, Sequence
 
 from spoonbill.common import DEFAULT_FIELDS, DEFAULT_FIELDS_COMBINED
 from spoonbill.i18n import _
-from spoonbill.utils import combine_path, common_prefix, generate_table_name, get_pointer
+from spoonbill.utils import combine_path, generate_table_name, get_pointer
 
 LOGGER = logging.getLogger("spoonbill")
 
@@ -26,6 +27,11 @@ class Column:
     id: str
     hits: int = 0
 
+    def __post_init__(self):
+        # the same ids are used as keys of columns, titles and rows across all tables
+        if isinstance(self.id, str):
+            self.id = sys.intern(self.id)
+
 
 @dataclass
 class Table:
@@ -172,11 +178,14 @@ class Table:
     def is_array(self, path):
         """
         Check whether the given path is in any table's arrays.
-        """
 
-        for array in sorted(self.arrays, reverse=True):
-            if common_prefix(array, path) == array:
-                return array
+        :return: The longest array containing the path, False if none does
+        """
+        # walk up the path's parents instead of testing every array
+        while path:
+            if path in self.arrays:
+                return path
+            path = path.rpartition("/")[0]
         return False
 
     def inc_column(self, abs_path, path):
@@ -228,7 +228,10 @@ class DataPreprocessor:
                                 self.add_preview_row(rows, record.get("id", ""), parent_key)
 
                     # TODO: this validation should probably be smarter with arrays
-                    if item_type and item_type != JOINABLE and not validate_type(item_type, item):
+                    # objects are not validated: they are flattened into their own columns even where the schema
+                    # declares a scalar, as when they were read as OrderedDict which validate_type accepted
+                    mismatched = item_type and item_type != JOINABLE and not validate_type(item_type, item)
+                    if mismatched and not isinstance(item, dict):
                         LOGGER.error("Mismatched type on %s expected %s" % (pointer, item_type))
                         continue
 
@@ -1,16 +1,24 @@
-import codecs
+import contextlib
 import functools
 import gzip
+import importlib
 import json
 import logging
-from collections import OrderedDict
+import os
 from dataclasses import replace
 from itertools import chain
-from numbers import Number
 from pathlib import Path
 
 import ijson
 import requests
+from ocdsextensionregistry import ProfileBuilder
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    json_loads = json.loads
 
 PYTHON_TO_JSON_TYPE = {
     "list": "array",
@@ -19,6 +27,11 @@ PYTHON_TO_JSON_TYPE = {
     "int": "integer",
     "float": "number",
 }
+# JSON type which must be declared by schema for values of each Python type, other types are not validated
+VALIDATED_TYPES = {
+    list: "array",
+    dict: "object",
+}
 LOGGER = logging.getLogger("spoonbill")
 
 ABBREVIATION_KEY = {
@@ -33,12 +46,38 @@ ABBREVIATION_TABLE_NAME = {
 }
 
 GZIP_MAGIC_NUMBER = (b"\x1f", b"\x8b")
+SCHEMA_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "spoonbill"
+# reuse connections between requests
+SESSION = requests.Session()
+IJSON_BACKENDS = ("yajl2_c", "yajl2_cffi", "yajl2", "python")
 
 
-@functools.lru_cache(maxsize=None)
+def get_ijson_backend():
+    """Get the fastest available ijson backend
+
+    >>> get_ijson_backend().backend_name in IJSON_BACKENDS
+    True
+    """
+    for name in IJSON_BACKENDS:
+        try:
+            return importlib.import_module(f"ijson.backends.{name}")
+        except ImportError:
+            continue
+    return ijson  # pragma: no cover
+
+
+IJSON = get_ijson_backend()
+# longest line parsed as a whole in line-delimited JSON, longer values are streamed with ijson
+MAX_LINE_SIZE = 1 << 24
+
+
+@functools.lru_cache(maxsize=8192)
 def common_prefix(path, subpath, separator="/"):
     """Given two paths, returns the longest common sub-path.
 
+    Not used by spoonbill itself anymore, kept only as public API. Use `path_has_prefix` to check whether one path
+    starts another.
+
     >>> common_prefix('/contracts', '/contracts/items')
     '/contracts'
     >>> common_prefix('/tender/submissionMethod', '/tender/submissionMethodDetails')
@@ -47,24 +86,81 @@ def common_prefix(path, subpath, separator="/"):
     '/tender/items'
     >>> common_prefix('/tender/items/0/additionalClassifications/0/id', '/tender/items/0')
     '/tender/items/0'
+    >>> common_prefix('/tender/items', '/tender/items/0/id')
+    '/tender/items'
     """
-    paths = [path.split(separator), subpath.split(separator)]
-    if len(paths[0]) <= len(paths[1]):
-        s1, s2 = paths
-    else:
-        s2, s1 = paths
-    for i, path in enumerate(s1):
-        if path != s2[i]:
-            common = s1[:i]
+    # most of the time one path is a prefix of the other, so try it before splitting
+    if path == subpath or path.startswith(subpath + separator):
+        return subpath
+    if subpath.startswith(path + separator):
+        return path
+    common = []
+    for part, subpart in zip(path.split(separator), subpath.split(separator)):
+        if part != subpart:
             break
-    else:
-        common = s1
+        common.append(part)
     return separator.join(common)
 
 
+def path_has_prefix(path, prefix, separator="/"):
+    """Check whether `prefix` is a leading sub-path of `path`
+
+    Equivalent to `common_prefix(prefix, path) == prefix` for non-empty prefixes.
+
+    >>> path_has_prefix('/tender/items/id', '/tender/items')
+    True
+    >>> path_has_prefix('/tender/items', '/tender/items')
+    True
+    >>> path_has_prefix('/tender/itemsCount', '/tender/items')
+    False
+    """
+    return path == prefix or path.startswith(prefix + separator)
+
+
+def iter_lines(fd):
+    """Iterate over line-delimited JSON parsing each line as a whole
+
+    Falls back to ijson for the rest of the stream as soon as a value is not contained in a single line of at most
+    `MAX_LINE_SIZE` bytes, e.g. in case of concatenated pretty-printed JSON or values not separated by newlines.
+
+    :param fd: File descriptor
+    :return: Iterator of items
+
+    >>> len([r for r in iter_lines(open('tests/data/ocds-sample-data.jsonl', 'rb'))])
+    8
+    >>> import io
+    >>> [r["id"] for r in iter_lines(io.BytesIO(b'{\\n  "id": 1\\n}\\n{"id": 2}'))]
+    [1, 2]
+    >>> [r["id"] for r in iter_lines(io.BytesIO(b'{"id": 1}\\n\\n{\\n  "id": 2\\n}\\n{"id": 3}\\n'))]
+    [1, 2, 3]
+    >>> [r["id"] for r in iter_lines(io.BytesIO(b'{"id": 1}\\n{"id": 2}{"id": 3}'))]
+    [1, 2, 3]
+    """
+    while True:
+        offset = fd.tell()
+        line = fd.readline(MAX_LINE_SIZE)
+        if not line:
+            return
+        if line.endswith(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                item = json_loads(line)
+            except ValueError:
+                pass
+            else:
+                yield item
+                continue
+        fd.seek(offset)
+        yield from IJSON.items(fd, prefix="", multiple_values=True, use_float=True)
+        return
+
+
 def iter_file(fd, root, multiple_values=False):
     """Iterate over `root` array in file provided by `filename` using ijson
 
+    Line-delimited JSON is parsed line by line, which is considerably faster than event based parsing.
+
     :param fd: File descriptor
     :param str root: Array field name inside file
     :param bool multiple_values: Determine line-delimited JSON
@@ -75,9 +171,11 @@ def iter_file(fd, root, multiple_values=False):
     >>> len([r for r in iter_file(open('tests/data/ocds-sample-data.json', 'rb'), 'releases')])
     6
     """
-    reader = ijson.items(
-        fd, prefix=("" if multiple_values else f"{root}.item"), multiple_values=multiple_values, map_type=OrderedDict
-    )
+    if multiple_values:
+        yield from iter_lines(fd)
+        return
+    LOGGER.debug("Using ijson %s backend", IJSON.backend_name)
+    reader = IJSON.items(fd, prefix=f"{root}.item", use_float=True)
     for item in reader:
         yield item
 
@@ -103,6 +201,9 @@ def extract_type(item):
 
 def validate_type(type_, item):
     """Validate if python object corresponds to provided type
+
+    Only plain lists and dicts are checked, any other value, including their subclasses, is accepted.
+
     >>> validate_type(['string'], 'test_string')
     True
     >>> validate_type(['number'], 11.1)
@@ -117,15 +218,16 @@ def validate_type(type_, item):
     False
     >>> validate_type(['object'], {})
     True
+    >>> validate_type(['string'], 11)
+    True
+    >>> from collections import OrderedDict
+    >>> validate_type(['array'], OrderedDict())
+    True
     """
-    if isinstance(item, Number):
-        name = "number"
-    else:
-        name = type(item).__name__
-    expected = PYTHON_TO_JSON_TYPE.get(name)
-    if expected:
-        return expected in type_
-    return True
+    expected = VALIDATED_TYPES.get(type(item))
+    if expected is None:
+        return True
+    return expected in type_
 
 
 def get_root(table):
@@ -136,13 +238,19 @@ def get_root(table):
 
 
 def combine_path(root, path, index="0", separator="/"):
-    """Generates index based header for combined column"""
-    combined_path = path
-    for array in sorted(root.arrays, reverse=True):
-        if common_prefix(path, array) == array:
-            chunk = separator.join((array, index))
-            combined_path = combined_path.replace(array, chunk)
-    return combined_path
+    """Generates index based header for combined column
+
+    The path is walked once, appending `index` after every segment which closes one of the `root` arrays.
+    """
+    parts = path.split(separator)
+    prefix = parts[0]
+    combined = [prefix]
+    for part in parts[1:]:
+        prefix = separator.join((prefix, part))
+        combined.append(part)
+        if prefix in root.arrays:
+            combined.append(index)
+    return separator.join(combined)
 
 
 def get_matching_tables(tables, path):
@@ -154,15 +262,13 @@ def get_matching_tables(tables, path):
     :param path: Path like string
     :return: List of matched by path tables
     """
-    candidates = []
-    for table in tables.values():
-        for candidate in table.path:
-            if common_prefix(candidate, path) == candidate:
-                candidates.append(table)
-
-    return sorted(candidates, key=lambda c: max((len(p) for p in c.path)), reverse=True)
+    candidates = [
+        table for table in tables.values() if any(path_has_prefix(path, candidate) for candidate in table.path)
+    ]
+    return sorted(candidates, key=lambda c: max(map(len, c.path)), reverse=True)
 
 
+@functools.lru_cache(maxsize=None)
 def generate_table_name(parent_table, parent_key, key):
     """Generates name for non root table, to be used as sheet name
 
@@ -213,55 +319,107 @@ def recalculate_headers(table, path, abs_path, key, item, should_split, separato
     :param separator: header path separator
     """
 
-    def insert_after_key(columns, insert, last_key):
-        data = OrderedDict()
-        for key, val in columns.items():
-            data[key] = val
-            if key == last_key:
-                for k, v in insert.items():
-                    data[k] = v
-                    table.titles[k] = v.title
-        return data
+    def insert_after_key(table, columns, insert, last_key):
+        # columns are spliced in place: only the columns after `last_key` are moved
+        if last_key not in columns:
+            return
+        tail = []
+        for k in reversed(columns):
+            if k == last_key:
+                break
+            tail.append(k)
+        tail.reverse()
+        tail_keys = set(tail)
+        for k, v in insert.items():
+            table.titles[k] = v.title
+            if k in tail_keys:
+                # already known column keeps its hits
+                columns.move_to_end(k)
+            else:
+                columns[k] = v
+        for k in tail:
+            if k not in insert:
+                columns.move_to_end(k)
 
     base_prefix = separator.join((abs_path, key))
-    zero_prefix = get_pointer(table, separator.join((base_prefix, "0")), path, True)
-
-    zero_cols = {
-        col_p: col
-        for col_p, col in table.combined_columns.items()
-        if col_p.startswith(separator) and common_prefix(col_p, zero_prefix) == zero_prefix
-    }
-    new_cols = {}
-    for col_i, _ in enumerate(item[1:], 1):
-        col_prefix = get_pointer(table, separator.join((base_prefix, str(col_i))), path, True)
-
-        for col_p, col in zero_cols.items():
-            col_id = col.id.replace(zero_prefix, col_prefix)
-            new_cols[col_id] = replace(col, id=col_id, hits=0)
-
-    if new_cols:
-        last_key = list(zero_cols.keys())[-1]
-        table.combined_columns = insert_after_key(table.combined_columns, new_cols, last_key)
+    while table:
+        zero_prefix = get_pointer(table, separator.join((base_prefix, "0")), path, True)
+        zero_cols_prefix = zero_prefix + separator
+        zero_len = len(zero_prefix)
+
+        zero_cols = {
+            col_p: col
+            for col_p, col in table.combined_columns.items()
+            if col_p == zero_prefix or col_p.startswith(zero_cols_prefix)
+        }
+        new_cols = {}
+        for col_i, _ in enumerate(item[1:], 1):
+            col_prefix = get_pointer(table, separator.join((base_prefix, str(col_i))), path, True)
+
+            for col_p, col in zero_cols.items():
+                col_id = col_prefix + col.id[zero_len:]
+                new_cols[col_id] = replace(col, id=col_id, hits=0)
+
+        if not new_cols:
+            break
+        last_key = list(zero_cols)[-1]
+        insert_after_key(table, table.combined_columns, new_cols, last_key)
         if should_split:
             for col_path in chain(zero_cols, new_cols):
                 table.columns.pop(col_path, "")
         else:
-            table.columns = insert_after_key(table.columns, new_cols, last_key)
-        if not table.is_root:
-            recalculate_headers(table.parent, path, abs_path, key, item, should_split, separator)
+            insert_after_key(table, table.columns, new_cols, last_key)
+        if table.is_root:
+            break
+        table = table.parent
 
 
 def resolve_file_uri(file_path):
     """Read json file from provided uri
 
+    Files and responses are read as bytes and decoded by the JSON parser itself.
+
     :param file_path: URI to file, could be url or path
     :return: Read file as dictionary
+
+    >>> resolve_file_uri('tests/data/ocds-simplified-schema.json')['title']
+    'Schema for an Open Contracting Release'
+    """
+    if isinstance(file_path, str) and file_path.startswith(("http://", "https://")):
+        return json_loads(SESSION.get(file_path).content)
+    with open(file_path, "rb") as fd:
+        return json_loads(fd.read())
+
+
+@functools.lru_cache(maxsize=None)
+def get_package_schema(tag, pkg_type):
+    """Get OCDS package schema of the given version
+
+    The schema is downloaded once, with the release schema embedded instead of referenced by URL, and then read
+    from the cache directory, so that cached schemas are used without network access.
+    Returned schema is shared between calls and should not be modified.
+
+    :param str tag: OCDS version tag
+    :param str pkg_type: Field name to access records, `releases` or `records`
+    :return: Package schema as dictionary
     """
-    if isinstance(file_path, (str, Path)):
-        with codecs.open(file_path, encoding="utf-8") as fd:
-            return json.load(fd, object_pairs_hook=OrderedDict)
-    if file_path.startswith("http://") or file_path.startswith("https://"):
-        return requests.get(file_path).json()
+    path = SCHEMA_CACHE_DIR / f"schema-{tag}-{pkg_type}.json"
+    if path.is_file():
+        return resolve_file_uri(path)
+    profile = ProfileBuilder(tag, {})
+    if pkg_type == "releases":
+        schema = profile.release_package_schema(embed=True)
+    else:
+        schema = profile.record_package_schema(embed=True)
+    try:
+        SCHEMA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as fd:
+            json.dump(schema, fd)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        LOGGER.warning("Failed to cache schema to %s: %s", path, e)
+    return schema
 
 
 def read_lines(path):
@@ -270,13 +428,16 @@ def read_lines(path):
         return [line.strip() for line in fd.readlines()]
 
 
-def get_pointer(table, abs_path, path, split, *, separator="/", index=None):
+def get_pointer(table, abs_path, path, split, *, separator="/", index=None, array=None):
     """Combine path and abs_path in order to fit table columns
 
     For example /tender/items/0/id should be /tender/items/0/id for tenders table
     but /tender/items/id for tenders_items table
+
+    :param array: Result of `table.is_array(path)` if already known
     """
-    array = table.is_array(path)
+    if array is None:
+        array = table.is_array(path)
     if index and (array or table.is_combined):
         return separator.join((abs_path, index))
     if table.is_root:
@@ -306,12 +467,16 @@ class RepeatFilter(logging.Filter):
     Logger filter to avoid repeating of same messages during file processing
     """
 
+    last_msg = last_levelno = last_module = None
+
     def filter(self, record):
-        current_log = (record.module, record.levelno, record.msg)
-        if current_log != getattr(self, "last_log", None):
-            self.last_log = current_log
-            return True
-        return False
+        # compared field by field, the message first as the most likely to differ
+        if record.msg == self.last_msg and record.levelno == self.last_levelno and record.module == self.last_module:
+            return False
+        self.last_msg = record.msg
+        self.last_levelno = record.levelno
+        self.last_module = record.module
+        return True
 
 
 def make_count_column(array):
@@ -334,8 +499,35 @@ def get_reader(path):
     :param path: path to a file
     :return: reader function
     """
-    first_bytes = open(path, "rb").read(2)
+    with open(path, "rb") as fd:
+        first_bytes = fd.read(2)
     if (first_bytes[0:1], first_bytes[1:2]) == GZIP_MAGIC_NUMBER:
         return gzip.open
     else:
         return open
+
+
+@contextlib.contextmanager
+def open_file(path):
+    """
+    Open a file for binary reading, decompressing it if it is gzipped
+
+    Unlike `get_reader` the file is opened only once.
+
+    :param path: path to a file
+    :return: file object
+
+    >>> with open_file('tests/data/ocds-sample-data.json') as fd:
+    ...     fd.read(1)
+    b'{'
+    >>> with open_file('tests/data/ocds-sample-data.json.gz') as fd:
+    ...     fd.read(1)
+    b'{'
+    """
+    with open(path, "rb") as fd:
+        first_bytes = fd.peek(2)[:2]
+        if (first_bytes[0:1], first_bytes[1:2]) == GZIP_MAGIC_NUMBER:
+            with gzip.GzipFile(fileobj=fd) as gzip_fd:
+                yield gzip_fd
+        else:
+            yield fd
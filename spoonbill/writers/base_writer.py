@@ -57,3 +57,13 @@ class BaseWriter:
         self.headers[name] = self.get_headers(table, options)
         self.names[name] = self._name_check(options.name or name)
         return self.names[name], self.headers[name]
+
+    def writerows(self, table, rows):
+        """
+        Write rows to the output file.
+
+        :param table: Table name
+        :param rows: Rows of the table
+        """
+        for row in rows:
+            self.writerow(table, row)
@@ -15,6 +15,8 @@ class CSVWriter(BaseWriter):
     """
 
     name = "csv"
+    # size of the write buffer of each output file
+    buffer_size = 1 << 20
 
     def __init__(self, workdir, tables, options):
         """
@@ -25,6 +27,9 @@ class CSVWriter(BaseWriter):
 
         super().__init__(workdir, tables, options)
         self.writers = {}
+        self.fields = {}
+        self.fieldnames = {}
+        self.write = {}
         self.fds = []
 
     def __enter__(self):
@@ -38,18 +43,22 @@ class CSVWriter(BaseWriter):
             try:
                 path = self.workdir / f"{table_name}.csv"
                 LOGGER.info(_("Dumping table '{}' to file '{}'").format(table_name, path))
-                fd = open(path, "w")
+                fd = open(path, "w", buffering=self.buffer_size, newline="", encoding="utf-8")
             except (IOError, OSError) as e:
                 LOGGER.error(_("Failed to open file {} with error {}").format(path, e))
                 return
-            writer = csv.DictWriter(fd, headers)
+            # rows are projected on the headers beforehand, which is cheaper than csv.DictWriter doing it per row
+            writer = csv.writer(fd)
             self.fds.append(fd)
             self.writers[name] = writer
+            self.write[name] = writer.writerow
+            self.fields[name] = set(headers)
+            self.fieldnames[name] = tuple(headers)
 
         for name, writer in self.writers.items():
             headers = self.headers[name]
             try:
-                writer.writerow(headers)
+                writer.writerow(headers.values())
             except ValueError as err:
                 LOGGER.error(_("Failed to headers with error {}").format(err))
         return self
@@ -68,9 +77,38 @@ class CSVWriter(BaseWriter):
         """
 
         try:
-            self.writers[table].writerow(row)
-        except ValueError as err:
-            LOGGER.error(_("Operation produced invalid path. This a software bug, please send issue to developers"))
-            LOGGER.error(_("Failed to write row {} with error {}").format(row.get("rowID"), err))
+            write = self.write[table]
         except KeyError:
             LOGGER.error(_("Invalid table {}").format(table))
+            return
+        for values in self._valid_rows(table, (row,)):
+            write(values)
+
+    def writerows(self, table, rows):
+        """
+        Write rows to the output file.
+
+        Invalid rows are reported and skipped the same way as in `writerow`.
+        """
+
+        try:
+            writer = self.writers[table]
+        except KeyError:
+            LOGGER.error(_("Invalid table {}").format(table))
+            return
+        writer.writerows(self._valid_rows(table, rows))
+
+    def _valid_rows(self, table, rows):
+        fields = self.fields[table]
+        fieldnames = self.fieldnames[table]
+        for row in rows:
+            wrong_fields = row.keys() - fields
+            if wrong_fields:
+                err = "dict contains fields not in fieldnames: " + ", ".join([repr(x) for x in wrong_fields])
+                LOGGER.error(
+                    _("Operation produced invalid path. This a software bug, please send issue to developers")
+                )
+                LOGGER.error(_("Failed to write row {} with error {}").format(row.get("rowID"), err))
+                continue
+            get = row.get
+            yield [get(field, "") for field in fieldnames]
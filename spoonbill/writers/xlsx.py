@@ -64,6 +64,13 @@ class XlsxWriter(BaseWriter):
         Write a row to the output file.
         """
 
+        self.writerows(table, [row])
+
+    def writerows(self, table, rows):
+        """
+        Write rows to the output file.
+        """
+
         table_name = self.names.get(table, table)
         sheet = self.workbook.get_worksheet_by_name(table_name)
         columns = self.col_index[table]
@@ -71,6 +78,10 @@ class XlsxWriter(BaseWriter):
             LOGGER.error(_("Invalid table {}").format(table))
             return
 
+        for row in rows:
+            self._write_row(sheet, table, columns, row)
+
+    def _write_row(self, sheet, table, columns, row):
         for column, value in row.items():
             if isinstance(value, bool):
                 value = str(value)
@@ -327,3 +327,26 @@ def test_flatten_buyer(spec_analyzed, releases):
                 if buyer:
                     assert "/buyer/id" in row
                     assert "/buyer/name" in row
+
+
+def test_flatten_batch(spec_analyzed, releases):
+    options = FlattenOptions(
+        **{
+            "selection": {"tenders": {"split": True}, "parties": {"split": False}},
+        }
+    )
+    flattener = Flattener(options, spec_analyzed.tables)
+    expected = defaultdict(list)
+    for _count, flat in flattener.flatten(releases):
+        for name, rows in flat.items():
+            expected[name].extend(rows)
+
+    all_rows = defaultdict(list)
+    counters = []
+    for batch_counters, flat in flattener.flatten_batch(releases, batch_size=4):
+        assert len(batch_counters) <= 4
+        counters.extend(batch_counters)
+        for name, rows in flat.items():
+            all_rows[name].extend(rows)
+    assert counters == list(range(len(releases)))
+    assert all_rows == expected
@@ -1,14 +1,17 @@
+import json
 from operator import attrgetter
-from unittest.mock import call, mock_open, patch
+from pathlib import Path
+from unittest.mock import Mock, call, mock_open, patch
 
+import jsonref
 from jmespath import search
 from jsonpointer import resolve_pointer
 
 from spoonbill.common import JOINABLE_SEPARATOR
 from spoonbill.spec import Column, Table
 from spoonbill.stats import DataPreprocessor
-from spoonbill.utils import recalculate_headers
-from tests.conftest import TEST_COMBINED_TABLES, TEST_ROOT_TABLES, schema_path
+from spoonbill.utils import get_package_schema, recalculate_headers, resolve_file_uri
+from tests.conftest import TEST_COMBINED_TABLES, TEST_ROOT_TABLES, releases_path, schema_path
 from tests.data import (
     awards_arrays,
     awards_columns,
@@ -80,6 +83,46 @@ def test_resolve_schema_uri():
     assert isinstance(dp.schema, dict)
 
 
+@patch("spoonbill.utils.ProfileBuilder")
+def test_get_package_schema(builder, schema, tmpdir):
+    release_ref = {"$ref": "https://standard.open-contracting.org/schema/1__1__5/release-schema.json"}
+
+    def package_schema(title, pkg_type):
+        def build(embed=False):
+            return {"title": title, "properties": {pkg_type: {"items": schema if embed else release_ref}}}
+
+        return build
+
+    profile = builder.return_value
+    profile.release_package_schema.side_effect = package_schema("Release Package", "releases")
+    profile.record_package_schema.side_effect = package_schema("Record Package", "records")
+    with patch("spoonbill.utils.SCHEMA_CACHE_DIR", Path(tmpdir)):
+        get_package_schema.cache_clear()
+        assert get_package_schema("1__1__5", "releases")["title"] == "Release Package"
+        assert get_package_schema("1__1__5", "records")["title"] == "Record Package"
+        assert (Path(tmpdir) / "schema-1__1__5-releases.json").is_file()
+
+        # next run reads the cached file, which embeds the release schema and resolves without network access
+        get_package_schema.cache_clear()
+        cached = get_package_schema("1__1__5", "releases")
+        assert builder.call_count == 2
+        loader = Mock(side_effect=AssertionError("network access"))
+        resolved = jsonref.JsonRef.replace_refs(cached, loader=loader)
+        assert resolved["properties"]["releases"]["items"]["title"] == schema["title"]
+        loader.assert_not_called()
+    get_package_schema.cache_clear()
+
+
+@patch("spoonbill.utils.SESSION.get")
+def test_resolve_file_uri(get):
+    get.return_value.content = b'{"title": "Schema"}'
+    assert resolve_file_uri("https://standard.open-contracting.org/schema.json") == {"title": "Schema"}
+    get.assert_called_once_with("https://standard.open-contracting.org/schema.json")
+
+    assert resolve_file_uri(schema_path)["title"] == "Schema for an Open Contracting Release"
+    assert resolve_file_uri(str(schema_path))["title"] == "Schema for an Open Contracting Release"
+
+
 def test_get_table(spec, releases):
     table = spec.get_table("/tender")
     assert table.name == "tenders"
@@ -142,6 +185,21 @@ def test_mismatched_types(log, spec, releases):
     log.assert_has_calls([call("Mismatched type on /tender/id expected ['string', 'integer']")])
 
 
+@patch("spoonbill.LOGGER.error")
+def test_object_instead_of_scalar(log, spec):
+    # releases are read as plain dicts, objects are flattened even where the schema declares a scalar
+    with open(releases_path) as fd:
+        releases = json.load(fd)["releases"]
+    releases[0]["tender"]["title"] = {"en": "Title", "es": "Titulo"}
+    for _ in spec.process_items(releases):
+        pass
+    tenders = spec.tables["tenders"]
+    for path in "/tender/title/en", "/tender/title/es":
+        assert path in tenders.combined_columns
+        assert path in tenders.additional_columns
+    log.assert_not_called()
+
+
 @patch("spoonbill.LOGGER.error")
 def test_dump_restore(log, spec, releases, tmpdir):
     for _ in spec.process_items(releases):
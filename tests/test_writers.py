@@ -3,13 +3,14 @@ from pathlib import Path
 from unittest.mock import call, patch
 
 import openpyxl
+import pytest
 
 from spoonbill import FileAnalyzer, FileFlattener
 from spoonbill.flatten import Flattener, FlattenOptions
 from spoonbill.writers.csv import CSVWriter
 from spoonbill.writers.xlsx import XlsxWriter
 
-from .conftest import releases_path
+from .conftest import releases_path, schema_path
 from .utils import get_writers, prepare_tables, read_csv_headers, read_xlsx_headers
 
 ID_FIELDS = {"tenders": "/tender/id", "parties": "/parties/id"}
@@ -293,6 +294,37 @@ def test_writers_invalid_row(log, spec, tmpdir):
     )
 
 
+@patch("spoonbill.LOGGER.error")
+def test_writers_writerows(log, spec, tmpdir):
+    options = FlattenOptions(
+        **{
+            "selection": {
+                "parties": {"split": False},
+            }
+        }
+    )
+    tables = prepare_tables(spec, options, {"parties": "/parties/id"})
+    workdir = Path(tmpdir)
+    with CSVWriter(workdir, tables, options) as csv_writer, XlsxWriter(workdir, tables, options) as xlsx_writer:
+        for writer in csv_writer, xlsx_writer:
+            writer.writerows("test", [{}])
+            writer.writerows("parties", [{"/parties/id": "1"}, {"/test/test": "test"}, {"/parties/id": "2"}])
+    log.assert_has_calls(
+        [
+            call("Invalid table test"),
+            call("Operation produced invalid path. This a software bug, please send issue to developers"),
+            call("Failed to write row None with error dict contains fields not in fieldnames: '/test/test'"),
+            call("Invalid table test"),
+            call("Operation produced invalid path. This a software bug, please send issue to developers"),
+            call("Failed to write column /test/test to xlsx sheet parties"),
+        ]
+    )
+    with open(workdir / "parties.csv") as fd:
+        assert [line["/parties/id"] for line in csv.DictReader(fd)] == ["1", "2"]
+    sheet = openpyxl.load_workbook(workdir / "result.xlsx")["parties"]
+    assert [row[0].value for row in sheet.rows] == ["/parties/id", "1", "2"]
+
+
 @patch("spoonbill.LOGGER.error")
 @patch("spoonbill.writers.csv.open", **{"side_effect": OSError("test")})
 def test_writers_open_fail(open_, log, spec, tmpdir):
@@ -454,3 +486,35 @@ def test_flatten_multiple_files(spec, tmpdir, releases):
     wb = openpyxl.load_workbook(xlsx)
     ws = wb[sheet]
     assert ws.max_row - 1 == line_number * 2
+
+
+def test_analyzer_dump_to_file(spec, tmpdir):
+    workdir = Path(tmpdir)
+    analyzer = FileAnalyzer(workdir)
+    analyzer.spec = spec
+
+    analyzer.dump_to_file("result.state")
+    assert (workdir / "result.state").is_file()
+
+    analyzer.dump_to_file(["first.state", "second.state"])
+    assert (workdir / "first.state-2").is_file()
+
+
+def test_analyzer_progress(tmpdir):
+    workdir = Path(tmpdir)
+    path = releases_path.with_suffix(".json.gz")
+    analyzer = FileAnalyzer(workdir, schema=schema_path)
+    progress = list(analyzer.analyze_file(path, progress_interval=2))
+
+    assert [count for _, count in progress] == list(range(len(progress)))
+    positions = [read for read, _ in progress]
+    assert positions == sorted(positions)
+    assert positions[-1] == path.stat().st_size
+    assert positions[0] == positions[1]
+
+    # small inputs still end at the file size
+    progress = list(FileAnalyzer(workdir, schema=schema_path).analyze_file(path))
+    assert progress[-1] == (path.stat().st_size, len(progress) - 1)
+
+    with pytest.raises(ValueError):
+        list(analyzer.analyze_file(path, progress_interval=0))